@@ -1,30 +1,31 @@
-with open("log.txt", "r") as f:
+import re
+
+# sample line:
+# 2022-06-05 03:48:32.540 :0 [INFO] freeing    at 0x00110088: 0x8
+PAT = re.compile(
+  rb"(?m)^\S+ (\S+) \S+ \[[^\]]*\] "
+  rb"(allocating\s+at (0x[0-9a-f]+): (0x[0-9a-f]+)|freeing\s+at (0x[0-9a-f]+): (0x[0-9a-f]+))"
+)
+
+with open("log.txt", "rb") as f:
   log = f.read()
 
 allocs = {}
-for line in log.splitlines():
-  # sample line:
-  # 2022-06-05 03:48:32.540 :0 [INFO] freeing    at 0x00110088: 0x8
-  sections = line.split(" ")
-  if len(line) == 0:
-    continue
-  _date = sections[0]
-  time = sections[1]
-  path = sections[2]
-  _log_level = sections[3]
-  message = " ".join(sections[4:])
-  if message.startswith("allocating "):
-    addr = message.split(" ")[2][:-1]
-    size = message.split(" ")[3]
-    if addr in allocs:
+for m in PAT.finditer(log):
+  message = m[2]
+  if m[3] is not None:
+    addr = int(m[3], 16)
+    size = m[4]
+    if allocs.setdefault(addr, message) is not message:
       raise Exception("DOUBLE ALLOC!!")
-    allocs[addr] = message
-  elif message.startswith("freeing  "):
-    addr = message.split(" ")[5][:-1]
-    size = message.split(" ")[6]
-    if not addr in allocs:
+  else:
+    addr = int(m[5], 16)
+    size = m[6]
+    if allocs.pop(addr, None) is None:
       raise Exception("INVALID FREE!!")
-    del allocs[addr]
 
+if allocs:
+  # the report uses the time of the last line in the log
+  time = log.rstrip(b"\n").rsplit(b"\n", 1)[-1].split(b" ", 2)[1].decode()
 for addr, message in allocs.items():
-  print(f"at {time}: {message}")
+  print(f"at {time}: {message.decode()}")
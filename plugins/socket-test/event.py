@@ -1,76 +1,113 @@
-import json
+try:
+    import orjson
+    loads = orjson.loads
+    dumps = orjson.dumps
+except ImportError:
+    import json
+    loads = json.loads
+    def dumps(obj):
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+try:
+    import simdjson
+    # The parser owns its tape buffer, so reuse one for every frame.
+    parser = simdjson.Parser()
+    def parse(b):
+        return parser.parse(bytes(b))
+    # simdjson hands out lazy proxies that are only valid until the next parse,
+    # so anything we keep needs to be converted into plain python values.
+    def materialize(value):
+        if isinstance(value, simdjson.Object):
+            return value.as_dict()
+        if isinstance(value, simdjson.Array):
+            return value.as_list()
+        return value
+except ImportError:
+    parse = loads
+    def materialize(value):
+        return value
 
 def read(b):
-    blob = json.loads(b)
-    match blob["kind"]:
-        case "Event":
-            match blob["type"]:
-                case "BlockPlace": return BlockPlace.from_json(blob)
-                case other: print("unknown event " + other)
-        case "Reply":
-            reply_id = blob["reply_id"]
-            match blob["type"]:
-                case "Block": return Block.from_json(reply_id, blob)
-                case other: print("unknown reply " + other)
-    return None
+    blob = parse(b)
+    kind = blob["kind"]
+    ty = blob["type"]
+    func = DISPATCH.get((kind, ty))
+    if func is None:
+        print("unknown " + kind.lower() + " " + ty)
+        return None
+    return func(blob)
 
 class Reply:
+    __slots__ = ("reply_id",)
+
     def __init__(self, reply_id):
         self.reply_id = reply_id
+
 class Request:
+    __slots__ = ("reply_id",)
+
     def __init__(self, reply_id):
         self.reply_id = reply_id
 
-    def to_json(self):
-        return {
-            "kind": "Request",
-            "reply_id": self.reply_id,
-        }
-
 class Event:
-    pass
+    __slots__ = ()
 
 class SendChat(Event):
+    __slots__ = ("text",)
+
+    # Everything but the text is constant, so only the text needs encoding.
+    _PREFIX = b'{"kind":"Event","type":"SendChat","text":'
+    _SUFFIX = b'}'
+
     def __init__(self, text):
         self.text = text
 
-    def to_json(self):
-        return {
-            "kind": "Event",
-            "type": "SendChat",
-            "text": self.text,
-        }
+    def to_bytes(self):
+        return SendChat._PREFIX + dumps(self.text) + SendChat._SUFFIX
 
 class GetBlock(Request):
+    __slots__ = ("pos",)
+
     def __init__(self, reply_id, pos):
         super().__init__(reply_id)
         self.pos = pos
 
-    def to_json(self):
-        blob = super().to_json()
-        blob["type"] = "GetBlock"
-        blob["pos"] = self.pos
-        return blob
+    def to_bytes(self):
+        return b'{"kind":"Request","reply_id":%d,"type":"GetBlock","pos":%s}' % (
+            self.reply_id,
+            dumps(self.pos),
+        )
 
 class Block(Reply):
+    __slots__ = ("pos", "block")
+
     def __init__(self, reply_id, pos, block):
         super().__init__(reply_id)
         self.pos = pos
         self.block = block
 
     def from_json(reply_id, blob):
-        return Block(reply_id, blob["pos"], blob["block"])
+        return Block(reply_id, materialize(blob["pos"]), materialize(blob["block"]))
 
 class BlockPlace(Event):
+    __slots__ = ("pos",)
+
     def __init__(self, pos):
         self.pos = pos
 
     def from_json(blob):
-        return BlockPlace(blob["pos"])
+        return BlockPlace(materialize(blob["pos"]))
 
 class Ready(Event):
-    def to_json(self):
-        return {
-            "kind": "Event",
-            "type": "Ready",
-        }
+    __slots__ = ()
+
+    _PAYLOAD = b'{"kind":"Event","type":"Ready"}'
+
+    def to_bytes(self):
+        return Ready._PAYLOAD
+
+# Maps the (kind, type) of an incoming message to its constructor.
+DISPATCH = {
+    ("Event", "BlockPlace"): BlockPlace.from_json,
+    ("Reply", "Block"): lambda blob: Block.from_json(blob["reply_id"], blob),
+}
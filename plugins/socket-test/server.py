@@ -1,38 +1,61 @@
 import socket
 import event
 import sys
-import json
+from collections import deque
 
 class Server:
     def __init__(self):
         sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         sock.connect("server.sock")
-        self.file = sock.makefile(mode='rw')
-        self.buffer = bytearray()
-        self.cache = []
+        self.sock = sock
+        # Unread data lives in buf[head:tail]. recv writes straight into the
+        # free space after tail, so nothing is allocated in the steady state.
+        # buf[head:scan] is known not to contain a frame terminator.
+        self.buf = bytearray(65536)
+        self.head = 0
+        self.scan = 0
+        self.tail = 0
+        self.cache = deque()
         self.reply_id = 0
 
-    def send(self, event):
-        self.file.write(json.dumps(event.to_json()))
-        self.file.write('\0')
-        self.file.flush()
+    def send(self, ev):
+        self.sock.sendall(ev.to_bytes() + b'\0')
 
     def get_block(self, pos):
-        self.send(event.GetBlock(self.reply_id, pos))
-        reply = self.wait_for_reply()
+        reply_id = self.reply_id
         self.reply_id += 1
-        return reply
+        self.send(event.GetBlock(reply_id, pos))
+        return self.wait_for_reply(reply_id)
 
-    def wait_for_reply(self):
+    # Sends all the requests up front, and then waits for the replies, so that
+    # this only takes one round trip to the server.
+    def get_blocks(self, positions):
+        ids = []
+        for pos in positions:
+            self.send(event.GetBlock(self.reply_id, pos))
+            ids.append(self.reply_id)
+            self.reply_id += 1
+        pending = set(ids)
+        replies = {}
+        while pending:
+            message = self.recv_skip_cache()
+            if isinstance(message, event.Reply) and message.reply_id in pending:
+                pending.remove(message.reply_id)
+                replies[message.reply_id] = message
+            else:
+                self.cache.append(message)
+        return [replies[i] for i in ids]
+
+    def wait_for_reply(self, reply_id):
         while True:
             message = self.recv_skip_cache()
-            if issubclass(type(message), event.Reply):
+            if isinstance(message, event.Reply) and message.reply_id == reply_id:
                 return message
             self.cache.append(message)
 
     def recv(self):
-        if len(self.cache) > 0:
-            return self.cache.pop()
+        if self.cache:
+            return self.cache.popleft()
         return self.recv_skip_cache()
 
     def recv_skip_cache(self):
@@ -40,18 +63,39 @@ class Server:
             event = self.read_event()
             if event != None:
                 return event
-            b = bytes(self.file.read(1), encoding="utf-8")
-            if len(b) == 0:
+            if self.tail == len(self.buf):
+                self.compact()
+            # Make sure anything printed shows up before we block on the socket.
+            sys.stdout.flush()
+            n = self.sock.recv_into(memoryview(self.buf)[self.tail:])
+            if n == 0:
                 print("connection has been closed, exiting")
                 sys.exit(0)
-            self.buffer += b
+            self.tail += n
+
+    # Moves the unread data to the start of the buffer. If the buffer is full of
+    # a single unfinished frame, the buffer is grown instead.
+    def compact(self):
+        if self.head == 0:
+            self.buf.extend(bytes(len(self.buf)))
+            return
+        view = memoryview(self.buf)
+        view[:self.tail - self.head] = view[self.head:self.tail]
+        view.release()
+        self.scan -= self.head
+        self.tail -= self.head
+        self.head = 0
 
     def read_event(self):
-        idx = self.buffer.find(b'\0')
-        sys.stdout.flush()
+        idx = self.buf.find(b'\0', self.scan, self.tail)
         if idx == -1:
+            self.scan = self.tail
             return None
-        data = self.buffer[:idx]
-        self.buffer = self.buffer[idx+1:]
+        data = bytes(memoryview(self.buf)[self.head:idx])
+        self.head = idx + 1
+        self.scan = self.head
+        if self.head == self.tail:
+            self.head = 0
+            self.scan = 0
+            self.tail = 0
         return event.read(data)
-